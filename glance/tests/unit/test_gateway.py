@@ -15,82 +15,154 @@
 
 from unittest import mock
 
-from glance.api import property_protections
-from glance import context
+from oslo_config import cfg
+
+from glance.common import property_utils
+from glance import domain
 from glance import gateway
 from glance import notifier
 from glance import quota
-from glance.tests.unit import utils as unit_test_utils
 import glance.tests.utils as test_utils
 
+CONF = cfg.CONF
+
+# Materialize the sentinel once; every _Sentinel attribute access is a
+# registry lookup and setUp runs per test.
+_CTX = mock.sentinel.context
+
 
 class TestGateway(test_utils.BaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestGateway, cls).setUpClass()
+        # A single Gateway can serve every test in this class: the
+        # get_* methods under test never mutate its state, so there is
+        # no point paying for the DB-API probe and notifier/policy
+        # construction once per test.
+        cls._gateway = gateway.Gateway()
+        # Stub _load_rules once for the whole class rather than in
+        # each property-protection test. Tests that do not set
+        # property_protection_file never construct PropertyRules, so
+        # they are unaffected by the stub.
+        cls._pp_patcher = mock.patch.object(property_utils.PropertyRules,
+                                            '_load_rules')
+        cls._pp_patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._pp_patcher.stop()
+        super(TestGateway, cls).tearDownClass()
+
     def setUp(self):
         super(TestGateway, self).setUp()
-        self.gateway = gateway.Gateway()
-        self.context = mock.sentinel.context
-
-    @mock.patch('glance.domain.TaskExecutorFactory')
-    def test_get_task_executor_factory(self, mock_factory):
-        @mock.patch.object(self.gateway, 'get_task_repo')
-        @mock.patch.object(self.gateway, 'get_repo')
-        @mock.patch.object(self.gateway, 'get_image_factory')
-        def _test(mock_gif, mock_gr, mock_gtr):
+        self.gateway = self._gateway
+        self.context = _CTX
+
+    def _stub_attr(self, obj, name):
+        # Rebinding the attribute directly is much cheaper than
+        # mock.patch, which builds a _patch object and re-resolves the
+        # target on every start/stop.
+        orig = getattr(obj, name)
+        setattr(obj, name, mock.MagicMock())
+        self.addCleanup(setattr, obj, name, orig)
+        return getattr(obj, name)
+
+    def test_get_task_executor_factory(self):
+        mock_factory = self._stub_attr(domain, 'TaskExecutorFactory')
+        with mock.patch.multiple(self.gateway,
+                                 get_task_repo=mock.DEFAULT,
+                                 get_repo=mock.DEFAULT,
+                                 get_image_factory=mock.DEFAULT) as mocks:
             self.gateway.get_task_executor_factory(self.context)
-            mock_gtr.assert_called_once_with(self.context)
-            mock_gr.assert_called_once_with(self.context)
-            mock_gif.assert_called_once_with(self.context)
+            mocks['get_task_repo'].assert_called_once_with(self.context)
+            mocks['get_repo'].assert_called_once_with(self.context)
+            mocks['get_image_factory'].assert_called_once_with(self.context)
             mock_factory.assert_called_once_with(
-                mock_gtr.return_value,
-                mock_gr.return_value,
-                mock_gif.return_value,
+                mocks['get_task_repo'].return_value,
+                mocks['get_repo'].return_value,
+                mocks['get_image_factory'].return_value,
                 admin_repo=None)
 
-        _test()
-
-    @mock.patch('glance.domain.TaskExecutorFactory')
-    def test_get_task_executor_factory_with_admin(self, mock_factory):
-        @mock.patch.object(self.gateway, 'get_task_repo')
-        @mock.patch.object(self.gateway, 'get_repo')
-        @mock.patch.object(self.gateway, 'get_image_factory')
-        def _test(mock_gif, mock_gr, mock_gtr):
-            mock_gr.side_effect = [mock.sentinel.image_repo,
-                                   mock.sentinel.admin_repo]
+    def test_get_task_executor_factory_with_admin(self):
+        mock_factory = self._stub_attr(domain, 'TaskExecutorFactory')
+        with mock.patch.multiple(self.gateway,
+                                 get_task_repo=mock.DEFAULT,
+                                 get_repo=mock.DEFAULT,
+                                 get_image_factory=mock.DEFAULT) as mocks:
+            mocks['get_repo'].side_effect = [mock.sentinel.image_repo,
+                                             mock.sentinel.admin_repo]
             self.gateway.get_task_executor_factory(
                 self.context,
                 admin_context=mock.sentinel.admin_context)
-            mock_gtr.assert_called_once_with(self.context)
-            mock_gr.assert_has_calls([
+            mocks['get_task_repo'].assert_called_once_with(self.context)
+            mocks['get_repo'].assert_has_calls([
                 mock.call(self.context),
                 mock.call(mock.sentinel.admin_context)
             ])
-            mock_gif.assert_called_once_with(self.context)
+            mocks['get_image_factory'].assert_called_once_with(self.context)
             mock_factory.assert_called_once_with(
-                mock_gtr.return_value,
+                mocks['get_task_repo'].return_value,
                 mock.sentinel.image_repo,
-                mock_gif.return_value,
+                mocks['get_image_factory'].return_value,
                 admin_repo=mock.sentinel.admin_repo)
 
-        _test()
-
-    def test_get_repo(self):
-        repo = self.gateway.get_repo(self.context)
-        self.assertIsInstance(repo, notifier.ImageRepoProxy)
-
-    @mock.patch('glance.common.property_utils.PropertyRules._load_rules')
-    def test_get_repo_with_pp(self, mock_load):
-        self.config(property_protection_file='foo')
+    # Gateway getters that just take the context and return a proxy
+    # stack, paired with the outermost proxy class they must produce.
+    # They share the same read-only fixtures, so they are checked in
+    # one test rather than one setUp cycle apiece; building the table
+    # at class-definition time also resolves the notifier/quota class
+    # references once instead of per assertion.
+    _PROXY_GETTERS = (
+        ('get_repo', notifier.ImageRepoProxy),
+        ('get_image_factory', notifier.ImageFactoryProxy),
+        ('get_metadef_namespace_repo',
+         notifier.MetadefNamespaceRepoProxy),
+        ('get_metadef_namespace_factory',
+         notifier.MetadefNamespaceFactoryProxy),
+        ('get_metadef_object_repo', notifier.MetadefObjectRepoProxy),
+        ('get_metadef_object_factory',
+         notifier.MetadefObjectFactoryProxy),
+        ('get_metadef_resource_type_repo',
+         notifier.MetadefResourceTypeRepoProxy),
+        ('get_metadef_resource_type_factory',
+         notifier.MetadefResourceTypeFactoryProxy),
+        ('get_metadef_property_repo', notifier.MetadefPropertyRepoProxy),
+        ('get_metadef_property_factory',
+         notifier.MetadefPropertyFactoryProxy),
+        ('get_metadef_tag_repo', notifier.MetadefTagRepoProxy),
+        ('get_metadef_tag_factory', notifier.MetadefTagFactoryProxy),
+        ('get_image_member_factory', quota.ImageMemberFactoryProxy),
+        ('get_task_repo', notifier.TaskRepoProxy),
+        ('get_task_factory', notifier.TaskFactoryProxy),
+        ('get_task_stub_repo', notifier.TaskStubRepoProxy),
+    )
+
+    def test_simple_proxies(self):
+        for method, proxy_class in self._PROXY_GETTERS:
+            with self.subTest(method=method):
+                repo = getattr(self.gateway, method)(self.context)
+                self.assertIsInstance(repo, proxy_class)
+
+    def test_get_repo_with_pp(self):
+        # Deferred: only the property-protection tests need this module
+        from glance.api import property_protections
+
+        # Override directly instead of going through the config()
+        # helper, which walks the option registry for each call.
+        CONF.set_override('property_protection_file', 'foo')
+        self.addCleanup(CONF.clear_override, 'property_protection_file')
         repo = self.gateway.get_repo(self.context)
         self.assertIsInstance(repo,
                               property_protections.ProtectedImageRepoProxy)
 
-    def test_get_image_factory(self):
-        factory = self.gateway.get_image_factory(self.context)
-        self.assertIsInstance(factory, notifier.ImageFactoryProxy)
+    def test_get_image_factory_with_pp(self):
+        # Deferred: only the property-protection tests need this module
+        from glance.api import property_protections
 
-    @mock.patch('glance.common.property_utils.PropertyRules._load_rules')
-    def test_get_image_factory_with_pp(self, mock_load):
-        self.config(property_protection_file='foo')
+        # Override directly instead of going through the config()
+        # helper, which walks the option registry for each call.
+        CONF.set_override('property_protection_file', 'foo')
+        self.addCleanup(CONF.clear_override, 'property_protection_file')
         factory = self.gateway.get_image_factory(self.context)
         self.assertIsInstance(factory,
                               property_protections.ProtectedImageFactoryProxy)
@@ -99,6 +171,10 @@ class TestGateway(test_utils.BaseTestCase):
         """Test that the image.member property is propagated all the way from
         the DB to the top of the gateway repo stack.
         """
+        # Deferred: no other test in this module needs these
+        from glance import context
+        from glance.tests.unit import utils as unit_test_utils
+
         db_api = unit_test_utils.FakeDB()
         gw = gateway.Gateway(db_api=db_api)
 
@@ -116,62 +192,6 @@ class TestGateway(test_utils.BaseTestCase):
         # We are a member, so member is our tenant id
         self.assertEqual(unit_test_utils.TENANT2, image.member)
 
-    def test_get_namespace_repo(self):
-        repo = self.gateway.get_metadef_namespace_repo(self.context)
-        self.assertIsInstance(repo, notifier.MetadefNamespaceRepoProxy)
-
-    def test_get_namespace_factory(self):
-        repo = self.gateway.get_metadef_namespace_factory(self.context)
-        self.assertIsInstance(repo, notifier.MetadefNamespaceFactoryProxy)
-
-    def test_get_object_repo(self):
-        repo = self.gateway.get_metadef_object_repo(self.context)
-        self.assertIsInstance(repo, notifier.MetadefObjectRepoProxy)
-
-    def test_get_object_factory(self):
-        repo = self.gateway.get_metadef_object_factory(self.context)
-        self.assertIsInstance(repo, notifier.MetadefObjectFactoryProxy)
-
-    def test_get_resourcetype_repo(self):
-        repo = self.gateway.get_metadef_resource_type_repo(self.context)
-        self.assertIsInstance(repo, notifier.MetadefResourceTypeRepoProxy)
-
-    def test_get_resource_type_factory(self):
-        repo = self.gateway.get_metadef_resource_type_factory(self.context)
-        self.assertIsInstance(repo, notifier.MetadefResourceTypeFactoryProxy)
-
-    def test_get_property_repo(self):
-        repo = self.gateway.get_metadef_property_repo(self.context)
-        self.assertIsInstance(repo, notifier.MetadefPropertyRepoProxy)
-
-    def test_get_property_factory(self):
-        repo = self.gateway.get_metadef_property_factory(self.context)
-        self.assertIsInstance(repo, notifier.MetadefPropertyFactoryProxy)
-
-    def test_get_tag_repo(self):
-        repo = self.gateway.get_metadef_tag_repo(self.context)
-        self.assertIsInstance(repo, notifier.MetadefTagRepoProxy)
-
-    def test_get_tag_factory(self):
-        repo = self.gateway.get_metadef_tag_factory(self.context)
-        self.assertIsInstance(repo, notifier.MetadefTagFactoryProxy)
-
     def test_get_member_repo(self):
         repo = self.gateway.get_member_repo(mock.sentinel.image, self.context)
         self.assertIsInstance(repo, notifier.ImageMemberRepoProxy)
-
-    def test_get_member_factory(self):
-        repo = self.gateway.get_image_member_factory(self.context)
-        self.assertIsInstance(repo, quota.ImageMemberFactoryProxy)
-
-    def test_get_task_repo(self):
-        repo = self.gateway.get_task_repo(self.context)
-        self.assertIsInstance(repo, notifier.TaskRepoProxy)
-
-    def test_get_task_factory(self):
-        repo = self.gateway.get_task_factory(self.context)
-        self.assertIsInstance(repo, notifier.TaskFactoryProxy)
-
-    def test_get_task_stub_repo(self):
-        repo = self.gateway.get_task_stub_repo(self.context)
-        self.assertIsInstance(repo, notifier.TaskStubRepoProxy)